@@ -6,17 +6,33 @@ Reads /mnt/projekte/Code/pw_convoverb/assets/ir-library.irlib
 Writes /mnt/projekte/Code/algo-dsp/web/irs.irlib
 """
 
+import argparse
+import functools
+import mmap
 import struct
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 import numpy as np
-from scipy.signal import resample_poly
+from scipy.signal import firwin, resample_poly
 from math import gcd
 
+try:
+    import cupy as cp
+    from cupyx.scipy.signal import resample_poly as cu_resample_poly
+except ImportError:  # GPU resampling is optional
+    cp = None
+
 SRC_PATH = "/mnt/projekte/Code/pw_convoverb/assets/ir-library.irlib"
 DST_PATH = "/mnt/projekte/Code/algo-dsp/web/irs.irlib"
 
 TARGET_RATE = 48000
 
+# GPU resampling (--gpu) only pays for the host/device transfer on large IRs,
+# and cupyx's resample_poly misbehaves for large up/down factors.
+GPU_MIN_SAMPLES = 1 << 18
+GPU_MAX_FACTOR = 128
+
 WANTED_NAMES = {"Brick Wall", "Small Hall", "Large Hall", "Vocal Plate", "Large Church"}
 
 
@@ -24,98 +40,161 @@ WANTED_NAMES = {"Brick Wall", "Small Hall", "Large Hall", "Vocal Plate", "Large
 # Low-level helpers
 # ---------------------------------------------------------------------------
 
-def read_u16(f):
-    return struct.unpack("<H", f.read(2))[0]
+# Precompiled so the format strings are not re-parsed per field. Readers take
+# a buffer and an offset and return (value, next_offset).
+
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+_F64 = struct.Struct("<d")
+_FILE_HEADER = struct.Struct("<4sHIQ")  # "IRLB", version, ir_count, index_offset
+_CHUNK_HEADER = struct.Struct("<4sQ")   # "IR--"/"INDX", size
+_SUB_HEADER = struct.Struct("<4sI")     # "META"/"AUDI", size
+
+def read_u16(data, off):
+    return _U16.unpack_from(data, off)[0], off + 2
 
-def read_u32(f):
-    return struct.unpack("<I", f.read(4))[0]
+def read_u32(data, off):
+    return _U32.unpack_from(data, off)[0], off + 4
 
-def read_u64(f):
-    return struct.unpack("<Q", f.read(8))[0]
+def read_u64(data, off):
+    return _U64.unpack_from(data, off)[0], off + 8
 
-def read_f64(f):
-    return struct.unpack("<d", f.read(8))[0]
+def read_f64(data, off):
+    return _F64.unpack_from(data, off)[0], off + 8
 
-def read_str(f):
-    length = read_u16(f)
-    return f.read(length).decode("utf-8")
+def read_str(data, off):
+    length, off = read_u16(data, off)
+    end = off + length
+    return data[off:end].decode("utf-8"), end
 
 def write_u16(buf, v):
-    buf += struct.pack("<H", v)
-    return buf
+    buf.extend(_U16.pack(v))
 
 def write_u32(buf, v):
-    buf += struct.pack("<I", v)
-    return buf
+    buf.extend(_U32.pack(v))
 
 def write_u64(buf, v):
-    buf += struct.pack("<Q", v)
-    return buf
+    buf.extend(_U64.pack(v))
 
 def write_f64(buf, v):
-    buf += struct.pack("<d", v)
-    return buf
+    buf.extend(_F64.pack(v))
 
 def write_str(buf, s):
     enc = s.encode("utf-8")
-    buf = write_u16(buf, len(enc))
-    buf += enc
-    return buf
+    write_u16(buf, len(enc))
+    buf.extend(enc)
 
 def encode_f16(samples_f32):
-    """Encode float32 ndarray as IEEE 754 half-precision bytes (little-endian)."""
-    f16 = samples_f32.astype(np.float16)
-    return f16.tobytes()
+    """
+    Encode a float32 (frames, channels) ndarray as an interleaved IEEE 754
+    half-precision (little-endian) ndarray, ready to be written as-is.
+
+    The input is pinned to float32 because NumPy's vectorized half-precision
+    conversion (F16C / NEON) covers f32->f16, while f64 sources take a slower
+    path.
+    """
+    samples_f32 = np.asarray(samples_f32, dtype=np.float32)
+    return samples_f32.astype("<f2", order="C")
+
+def decode_f16_audio(raw_bytes, channels, offset=0, count=-1):
+    """
+    Decode f16 interleaved bytes to float32 array of shape (frames, channels).
+
+    offset is a byte offset into raw_bytes and count is the number of f16
+    samples to read from there (-1 for the rest of the buffer). Neither
+    copies raw_bytes, so the AUDI payload is decoded straight out of a
+    mapped file.
+    """
+    return (np.frombuffer(raw_bytes, dtype="<f2", count=count, offset=offset)
+            .reshape(-1, channels)
+            .astype(np.float32))
+
+
+# ---------------------------------------------------------------------------
+# IR library container
+# ---------------------------------------------------------------------------
 
-def decode_f16_audio(raw_bytes, channels):
-    """Decode f16 interleaved bytes to float32 array of shape (frames, channels)."""
-    uint16_arr = np.frombuffer(raw_bytes, dtype="<u2")
-    f16_arr = uint16_arr.view(np.float16)
-    f32_arr = f16_arr.astype(np.float32)
-    return f32_arr.reshape(-1, channels)
+@dataclass
+class IRLib:
+    """
+    Structure-of-arrays view of an IR library. Entry i is described by
+    names[i], categories[i], ..., and audios[i], a float32 ndarray of shape
+    (frames, channels).
+    """
+    names: list = field(default_factory=list)
+    categories: list = field(default_factory=list)
+    descriptions: list = field(default_factory=list)
+    tags: list = field(default_factory=list)
+    sample_rates: np.ndarray = field(default_factory=lambda: np.empty(0, np.float64))
+    channels: np.ndarray = field(default_factory=lambda: np.empty(0, np.int64))
+    audios: list = field(default_factory=list)
+
+    def __len__(self):
+        return len(self.names)
+
+    def select(self, mask):
+        """Return a new IRLib holding only the entries where mask is true."""
+        idx = np.flatnonzero(mask)
+        return IRLib(
+            names=[self.names[i] for i in idx],
+            categories=[self.categories[i] for i in idx],
+            descriptions=[self.descriptions[i] for i in idx],
+            tags=[self.tags[i] for i in idx],
+            sample_rates=self.sample_rates[idx],
+            channels=self.channels[idx],
+            audios=[self.audios[i] for i in idx],
+        )
 
 
 # ---------------------------------------------------------------------------
 # IRLB reader
 # ---------------------------------------------------------------------------
 
-def read_irlb(path):
-    """
-    Parse an IRLB file and return a list of dicts:
-        {name, category, description, tags, sample_rate, channels, audio}
-    where audio is a float32 ndarray of shape (frames, channels).
+def read_irlb(path, wanted=None):
     """
-    irs = []
+    Parse an IRLB file and return an IRLib whose audios are float32 ndarrays
+    of shape (frames, channels).
 
-    with open(path, "rb") as f:
+    If wanted is a set of names, IRs whose INDX name is not in it are skipped
+    before their chunk is touched, so their audio is never decoded.
+    """
+    names = []
+    categories = []
+    descriptions = []
+    tags = []
+    sample_rates = []
+    channel_counts = []
+    audios = []
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
         # File header (18 bytes)
-        magic = f.read(4)
+        magic = data[0:4]
         if magic != b"IRLB":
             raise ValueError(f"Bad magic: {magic!r}")
-        version = read_u16(f)
+        version, off = read_u16(data, 4)
         if version != 1:
             raise ValueError(f"Unsupported version: {version}")
-        ir_count = read_u32(f)
-        index_offset = read_u64(f)
+        ir_count, off = read_u32(data, off)
+        index_offset, off = read_u64(data, off)
 
         print(f"[read_irlb] version={version} ir_count={ir_count} index_offset={index_offset}")
 
         # Read INDEX chunk to get IR offsets and basic metadata.
-        f.seek(index_offset)
-        indx_magic = f.read(4)
+        indx_magic = data[index_offset:index_offset + 4]
         if indx_magic != b"INDX":
             raise ValueError(f"Expected INDX chunk, got {indx_magic!r}")
-        indx_size = read_u64(f)
+        indx_size, off = read_u64(data, index_offset + 4)
 
         entries = []
-        indx_end = f.tell() + indx_size
-        while f.tell() < indx_end:
-            entry_offset = read_u64(f)
-            entry_rate = read_f64(f)
-            entry_channels = read_u32(f)
-            entry_length = read_u32(f)
-            entry_name = read_str(f)
-            entry_category = read_str(f)
+        indx_end = off + indx_size
+        while off < indx_end:
+            entry_offset, off = read_u64(data, off)
+            entry_rate, off = read_f64(data, off)
+            entry_channels, off = read_u32(data, off)
+            entry_length, off = read_u32(data, off)
+            entry_name, off = read_str(data, off)
+            entry_category, off = read_str(data, off)
             entries.append({
                 "offset": entry_offset,
                 "sample_rate": entry_rate,
@@ -127,173 +206,241 @@ def read_irlb(path):
 
         print(f"[read_irlb] found {len(entries)} index entries")
 
+        if wanted is not None:
+            entries = [entry for entry in entries if entry["name"] in wanted]
+
         # For each entry, read the full IR chunk (META + AUDI).
         for entry in entries:
-            f.seek(entry["offset"])
-            ir_magic = f.read(4)
+            off = entry["offset"]
+            ir_magic = data[off:off + 4]
             if ir_magic != b"IR--":
                 print(f"  Warning: expected IR-- at offset {entry['offset']}, got {ir_magic!r}, skipping")
                 continue
-            chunk_size = read_u64(f)
-            chunk_end = f.tell() + chunk_size
+            chunk_size, off = read_u64(data, off + 4)
+            chunk_end = off + chunk_size
 
             meta = {}
             audio = None
 
-            while f.tell() < chunk_end:
-                sub_magic = f.read(4)
+            while off < chunk_end:
+                sub_magic = data[off:off + 4]
                 if len(sub_magic) < 4:
                     break
-                sub_size = read_u32(f)
-                sub_end = f.tell() + sub_size
+                sub_size, off = read_u32(data, off + 4)
+                sub_end = off + sub_size
 
                 if sub_magic == b"META":
-                    meta["sample_rate"] = read_f64(f)
-                    meta["channels"] = read_u32(f)
-                    meta["length"] = read_u32(f)
-                    meta["name"] = read_str(f)
-                    meta["description"] = read_str(f)
-                    meta["category"] = read_str(f)
-                    tag_count = read_u16(f)
-                    meta["tags"] = [read_str(f) for _ in range(tag_count)]
+                    meta["sample_rate"], off = read_f64(data, off)
+                    meta["channels"], off = read_u32(data, off)
+                    meta["length"], off = read_u32(data, off)
+                    meta["name"], off = read_str(data, off)
+                    meta["description"], off = read_str(data, off)
+                    meta["category"], off = read_str(data, off)
+                    tag_count, off = read_u16(data, off)
+                    meta["tags"] = []
+                    for _ in range(tag_count):
+                        tag, off = read_str(data, off)
+                        meta["tags"].append(tag)
                 elif sub_magic == b"AUDI":
-                    raw_audio = f.read(sub_size)
+                    # Validate against the index before touching the payload,
+                    # then decode straight out of the mapping.
                     channels = entry["channels"]
-                    audio = decode_f16_audio(raw_audio, channels)
+                    count = entry["length"] * channels
+                    if sub_size != count * 2:
+                        print(f"  Warning: AUDI size {sub_size} for {entry['name']!r} does not match "
+                              f"{entry['length']} frames x {channels}ch")
+                        break
+                    audio = decode_f16_audio(data, channels, offset=off, count=count)
                 else:
                     pass  # unknown sub-chunk, skip
 
-                f.seek(sub_end)
+                off = sub_end
 
             if not meta or audio is None:
                 print(f"  Warning: incomplete IR chunk for {entry['name']!r}, skipping")
                 continue
 
-            irs.append({
-                "name": meta.get("name", entry["name"]),
-                "category": meta.get("category", entry["category"]),
-                "description": meta.get("description", ""),
-                "tags": meta.get("tags", []),
-                "sample_rate": meta.get("sample_rate", entry["sample_rate"]),
-                "channels": meta.get("channels", entry["channels"]),
-                "audio": audio,  # shape (frames, channels), float32
-            })
-            print(f"  Loaded: {irs[-1]['name']!r:30s}  {int(irs[-1]['sample_rate'])}Hz  "
-                  f"{irs[-1]['channels']}ch  {irs[-1]['audio'].shape[0]} frames")
-
-    return irs
+            names.append(meta.get("name", entry["name"]))
+            categories.append(meta.get("category", entry["category"]))
+            descriptions.append(meta.get("description", ""))
+            tags.append(meta.get("tags", []))
+            sample_rates.append(meta.get("sample_rate", entry["sample_rate"]))
+            channel_counts.append(meta.get("channels", entry["channels"]))
+            audios.append(audio)  # shape (frames, channels), float32
+            print(f"  Loaded: {names[-1]!r:30s}  {int(sample_rates[-1])}Hz  "
+                  f"{channel_counts[-1]}ch  {audio.shape[0]} frames")
+
+    return IRLib(
+        names=names,
+        categories=categories,
+        descriptions=descriptions,
+        tags=tags,
+        sample_rates=np.array(sample_rates, dtype=np.float64),
+        channels=np.array(channel_counts, dtype=np.int64),
+        audios=audios,
+    )
 
 
 # ---------------------------------------------------------------------------
 # Resampling
 # ---------------------------------------------------------------------------
 
-def resample_ir(audio_f32, src_rate, dst_rate):
-    """Resample audio from src_rate to dst_rate using polyphase resampling."""
-    if int(src_rate) == int(dst_rate):
-        return audio_f32
+def _design_taps(up, down):
+    """
+    Design the polyphase anti-aliasing FIR for an up/down ratio.
 
-    g = gcd(int(src_rate), int(dst_rate))
+    Matches resample_poly's default Kaiser design. The gain factor `up` is
+    not applied here because resample_poly scales custom windows itself.
+    The taps are float32 like the audio, so resample_poly fills a float32
+    output directly instead of promoting to float64 and needing a cast copy.
+    """
+    max_rate = max(up, down)
+    taps = firwin(2 * 10 * max_rate + 1, 1.0 / max_rate, window=("kaiser", 5.0))
+    taps = taps.astype(np.float32)
+    taps.flags.writeable = False  # shared between callers via the cache
+    return taps
+
+
+@functools.lru_cache(maxsize=8)
+def _resample_params(src_rate, dst_rate):
+    """
+    Return (up, down, taps) for resampling src_rate to dst_rate.
+
+    Cached per rate pair, so the gcd and the filter design run once no matter
+    how many IRs share it. taps is None when the rates match, as no
+    resampling is needed.
+    """
+    src_rate, dst_rate = int(src_rate), int(dst_rate)
+    g = gcd(src_rate, dst_rate)
     up = dst_rate // g
-    down = int(src_rate) // g
+    down = src_rate // g
+    taps = _design_taps(up, down) if up != down else None
+    return up, down, taps
+
+
+def _gpu_eligible(audio_f32, up, down):
+    """Whether --gpu resamples this IR on the GPU rather than the CPU."""
+    return (cp is not None and audio_f32.size >= GPU_MIN_SAMPLES
+            and max(up, down) <= GPU_MAX_FACTOR)
+
+
+def resample_ir(audio_f32, src_rate, dst_rate, use_gpu=False):
+    """
+    Resample audio from src_rate to dst_rate.
+
+    Uses polyphase resampling with the cached taps. With use_gpu and CuPy
+    available, IRs of at least GPU_MIN_SAMPLES samples whose factors stay
+    within GPU_MAX_FACTOR are resampled on the GPU instead.
+    """
+    up, down, taps = _resample_params(src_rate, dst_rate)
+    if up == down:
+        return audio_f32
+
+    if use_gpu and _gpu_eligible(audio_f32, up, down):
+        # Same cached filter as the CPU path, so results do not depend on
+        # which device handled the IR.
+        res = cu_resample_poly(cp.asarray(audio_f32), up, down, axis=0,
+                               window=cp.asarray(taps)).get()
+        return res.astype(np.float32, copy=False)
+
+    # Resample all channels in one call with cached taps, so the filter is
+    # designed once per rate pair; the result is already (frames, channels).
+    # The input is not padded to an FFT-friendly length: resample_poly
+    # convolves directly (upfirdn), so extra zeros would only add work.
+    res = resample_poly(audio_f32, up, down, axis=0, window=taps)
+    return res.astype(np.float32, copy=False)
 
-    channels = audio_f32.shape[1]
-    resampled_cols = []
-    for ch in range(channels):
-        col = audio_f32[:, ch]
-        res = resample_poly(col, up, down).astype(np.float32)
-        resampled_cols.append(res)
 
-    return np.column_stack(resampled_cols)
+def _do_resample(args):
+    """ProcessPoolExecutor entry point: resample_ir on an (audio, src, dst, use_gpu) tuple."""
+    return resample_ir(*args)
 
 
 # ---------------------------------------------------------------------------
 # IRLB writer
 # ---------------------------------------------------------------------------
 
-def build_ir_chunk(ir_dict, sample_rate, audio_f32):
-    """Build the bytes for a single IR-- chunk (META + AUDI sub-chunks)."""
-    channels = audio_f32.shape[1]
-    length = audio_f32.shape[0]
-
-    # --- META sub-chunk ---
-    meta_body = b""
-    meta_body = write_f64(meta_body, float(sample_rate))
-    meta_body = write_u32(meta_body, channels)
-    meta_body = write_u32(meta_body, length)
-    meta_body = write_str(meta_body, ir_dict["name"])
-    meta_body = write_str(meta_body, ir_dict.get("description", ""))
-    meta_body = write_str(meta_body, ir_dict.get("category", ""))
-    tags = ir_dict.get("tags", [])
-    meta_body = write_u16(meta_body, len(tags))
+def build_meta_body(sample_rate, audio_f32, name, description="", category="", tags=()):
+    """Build the payload of a META sub-chunk."""
+    buf = bytearray()
+    write_f64(buf, float(sample_rate))
+    write_u32(buf, audio_f32.shape[1])  # channels
+    write_u32(buf, audio_f32.shape[0])  # length
+    write_str(buf, name)
+    write_str(buf, description)
+    write_str(buf, category)
+    write_u16(buf, len(tags))
     for tag in tags:
-        meta_body = write_str(meta_body, tag)
-
-    meta_chunk = b"META" + struct.pack("<I", len(meta_body)) + meta_body
-
-    # --- AUDI sub-chunk ---
-    interleaved = audio_f32.flatten(order="C")
-    raw_audio = encode_f16(interleaved)
-    audi_chunk = b"AUDI" + struct.pack("<I", len(raw_audio)) + raw_audio
-
-    body = meta_chunk + audi_chunk
-    return b"IR--" + struct.pack("<Q", len(body)) + body
+        write_str(buf, tag)
+    return buf
 
 
-def write_irlb(path, selected_irs):
+def write_irlb(path, lib):
     """
-    Write a mini IRLB file with the given IRs (already resampled to TARGET_RATE).
-    Each element of selected_irs is a dict with keys:
-        name, category, description, tags, audio (ndarray float32, (frames, channels))
-    """
-    # We first build all IR chunk bytes so we know their offsets.
-    ir_chunks = []
-    for ir in selected_irs:
-        chunk_bytes = build_ir_chunk(ir, TARGET_RATE, ir["audio"])
-        ir_chunks.append(chunk_bytes)
+    Write a mini IRLB file with the IRs of lib (already resampled to
+    TARGET_RATE). Each audio is an ndarray float32 of shape (frames, channels).
 
-    # File header is 18 bytes.
-    HEADER_SIZE = 18
+    The file layout is computed up front, then every chunk is streamed to
+    disk in order. Each IR's f16 audio is written straight from its ndarray
+    through a memoryview, so only one IR's encoded samples exist at a time
+    and no bytes copy of them is made.
+    """
+    # File header is 18 bytes; chunk headers are magic + size.
+    HEADER_SIZE = _FILE_HEADER.size
+    IR_HEADER_SIZE = _CHUNK_HEADER.size
+    SUB_HEADER_SIZE = _SUB_HEADER.size
+    INDX_HEADER_SIZE = _CHUNK_HEADER.size
+
+    meta_bodies = [
+        build_meta_body(TARGET_RATE, audio, name, description, category, tags)
+        for name, category, description, tags, audio in zip(
+            lib.names, lib.categories, lib.descriptions, lib.tags, lib.audios)
+    ]
 
     # Lay out IR chunks starting right after the header.
     offsets = []
     pos = HEADER_SIZE
-    for chunk in ir_chunks:
+    for meta_body, audio in zip(meta_bodies, lib.audios):
         offsets.append(pos)
-        pos += len(chunk)
+        pos += IR_HEADER_SIZE + SUB_HEADER_SIZE + len(meta_body) + SUB_HEADER_SIZE + audio.size * 2
 
     # INDEX chunk starts at pos.
     index_offset = pos
 
-    # Build INDEX chunk body.
-    indx_body = b""
-    for ir, offset in zip(selected_irs, offsets):
-        audio = ir["audio"]
-        indx_body = write_u64(indx_body, offset)
-        indx_body = write_f64(indx_body, float(TARGET_RATE))
-        indx_body = write_u32(indx_body, audio.shape[1])
-        indx_body = write_u32(indx_body, audio.shape[0])
-        indx_body = write_str(indx_body, ir["name"])
-        indx_body = write_str(indx_body, ir.get("category", ""))
+    indx_body = bytearray()
+    for name, category, audio, offset in zip(lib.names, lib.categories, lib.audios, offsets):
+        write_u64(indx_body, offset)
+        write_f64(indx_body, float(TARGET_RATE))
+        write_u32(indx_body, audio.shape[1])
+        write_u32(indx_body, audio.shape[0])
+        write_str(indx_body, name)
+        write_str(indx_body, category)
+
+    total_size = index_offset + INDX_HEADER_SIZE + len(indx_body)
+    ir_count = len(lib)
 
-    indx_chunk = b"INDX" + struct.pack("<Q", len(indx_body)) + indx_body
+    with open(path, "wb") as f:
+        f.write(_FILE_HEADER.pack(b"IRLB", 1, ir_count, index_offset))
 
-    # File header.
-    ir_count = len(selected_irs)
-    header = b"IRLB"
-    header += struct.pack("<H", 1)          # version
-    header += struct.pack("<I", ir_count)   # ir_count
-    header += struct.pack("<Q", index_offset)  # index_offset
+        for meta_body, audio in zip(meta_bodies, lib.audios):
+            audio_size = audio.size * 2
+            body_size = SUB_HEADER_SIZE + len(meta_body) + SUB_HEADER_SIZE + audio_size
+            f.write(_CHUNK_HEADER.pack(b"IR--", body_size))
 
-    assert len(header) == HEADER_SIZE, f"Header size mismatch: {len(header)}"
+            # --- META sub-chunk ---
+            f.write(_SUB_HEADER.pack(b"META", len(meta_body)))
+            f.write(meta_body)
 
-    with open(path, "wb") as f:
-        f.write(header)
-        for chunk in ir_chunks:
-            f.write(chunk)
-        f.write(indx_chunk)
+            # --- AUDI sub-chunk ---
+            f.write(_SUB_HEADER.pack(b"AUDI", audio_size))
+            f.write(memoryview(encode_f16(audio)))
+
+        f.write(_CHUNK_HEADER.pack(b"INDX", len(indx_body)))
+        f.write(indx_body)
+
+        assert f.tell() == total_size, f"File size mismatch: {f.tell()} != {total_size}"
 
-    print(f"[write_irlb] wrote {path}  ({ir_count} IRs, {pos + len(indx_chunk)} bytes total)")
+    print(f"[write_irlb] wrote {path}  ({ir_count} IRs, {total_size} bytes total)")
 
 
 # ---------------------------------------------------------------------------
@@ -301,28 +448,69 @@ def write_irlb(path, selected_irs):
 # ---------------------------------------------------------------------------
 
 def main():
+    parser = argparse.ArgumentParser(description="Extract, resample and save selected IRs.")
+    parser.add_argument("--gpu", action="store_true",
+                        help="resample large IRs on the GPU (requires CuPy)")
+    args = parser.parse_args()
+
+    use_gpu = args.gpu
+    if use_gpu and cp is None:
+        print("Warning: --gpu requested but CuPy is not installed, resampling on the CPU")
+        use_gpu = False
+
     print(f"Reading IRs from: {SRC_PATH}")
-    all_irs = read_irlb(SRC_PATH)
+    lib = read_irlb(SRC_PATH, wanted=WANTED_NAMES)
 
     print(f"\nSelecting IRs: {sorted(WANTED_NAMES)}")
-    selected = [ir for ir in all_irs if ir["name"] in WANTED_NAMES]
+    selected = lib.select(np.isin(lib.names, list(WANTED_NAMES)))
 
-    found_names = {ir["name"] for ir in selected}
-    missing = WANTED_NAMES - found_names
+    missing = WANTED_NAMES - set(selected.names)
     if missing:
         print(f"Warning: the following IRs were not found: {missing}")
 
     print(f"\nResampling {len(selected)} IRs from source rate to {TARGET_RATE} Hz...")
-    for ir in selected:
-        src_rate = int(ir["sample_rate"])
-        orig_frames = ir["audio"].shape[0]
-        if src_rate != TARGET_RATE:
-            ir["audio"] = resample_ir(ir["audio"], src_rate, TARGET_RATE)
-            new_frames = ir["audio"].shape[0]
-            print(f"  {ir['name']!r}: {orig_frames} frames @ {src_rate} Hz  ->  "
+    # IRs are independent, so their resampling convolutions run in parallel
+    # across processes. Each job pickles its IR's audio to a worker and the
+    # result back, and each worker designs the taps once for its own
+    # _resample_params cache. GPU jobs and a lone CPU job stay in this
+    # process: one job has nothing to overlap with, and CUDA contexts do not
+    # survive a fork.
+    todo = [i for i in range(len(selected)) if int(selected.sample_rates[i]) != TARGET_RATE]
+    gpu_idx = []
+    cpu_idx = []
+    for i in todo:
+        up, down, _ = _resample_params(selected.sample_rates[i], TARGET_RATE)
+        if use_gpu and _gpu_eligible(selected.audios[i], up, down):
+            gpu_idx.append(i)
+        else:
+            cpu_idx.append(i)
+    gpu_jobs = [(selected.audios[i], int(selected.sample_rates[i]), TARGET_RATE, True)
+                for i in gpu_idx]
+    cpu_jobs = [(selected.audios[i], int(selected.sample_rates[i]), TARGET_RATE, False)
+                for i in cpu_idx]
+
+    resampled = {}
+    if len(cpu_jobs) > 1:
+        with ProcessPoolExecutor() as ex:
+            # Executor.map submits every job, starting the workers, before it
+            # returns, so the GPU work below never precedes a fork.
+            cpu_results = ex.map(_do_resample, cpu_jobs)
+            resampled.update(zip(gpu_idx, map(_do_resample, gpu_jobs)))
+            resampled.update(zip(cpu_idx, cpu_results))
+    else:
+        resampled.update(zip(cpu_idx, map(_do_resample, cpu_jobs)))
+        resampled.update(zip(gpu_idx, map(_do_resample, gpu_jobs)))
+
+    for i, name in enumerate(selected.names):
+        src_rate = int(selected.sample_rates[i])
+        orig_frames = selected.audios[i].shape[0]
+        if i in resampled:
+            selected.audios[i] = resampled[i]
+            new_frames = selected.audios[i].shape[0]
+            print(f"  {name!r}: {orig_frames} frames @ {src_rate} Hz  ->  "
                   f"{new_frames} frames @ {TARGET_RATE} Hz")
         else:
-            print(f"  {ir['name']!r}: already at {TARGET_RATE} Hz, no resampling needed")
+            print(f"  {name!r}: already at {TARGET_RATE} Hz, no resampling needed")
 
     print(f"\nWriting output to: {DST_PATH}")
     write_irlb(DST_PATH, selected)